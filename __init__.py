@@ -18,6 +18,8 @@
 
 # Author: Adhi Hargo (cadmus.sw@gmail.com)
 
+import functools
+import itertools
 import math
 import random
 import re
@@ -46,6 +48,50 @@ PRF_TIP = "tip-"
 PRF_HOOK = "hook-"
 BBONE_BASE_SIZE = 0.01
 
+# Default layer sets for operators creating bones and widget objects.
+ARM_LAYERS_29 = tuple(x == 29 for x in range(0, 32))
+ARM_LAYERS_30 = tuple(x == 30 for x in range(0, 32))
+OBJ_LAYERS_19 = tuple(x == 19 for x in range(0, 20))
+
+INCREMENT_DICT_RE = re.compile(r"(\d+)\D*([+-])\D*(\d+)\D*")
+INT_RE = re.compile(r"\d+")
+
+
+@functools.lru_cache(maxsize=64)
+def compile_regex(pattern):
+    """Compiled regular expression for PATTERN, cached across operator calls."""
+    return re.compile(pattern)
+
+
+def literal_translation(pattern, replacement):
+    """Translation table equivalent to substituting REPLACEMENT for PATTERN, if
+    PATTERN is a single literal character. Otherwise None."""
+    if len(pattern) != 1 or re.escape(pattern) != pattern or '\\' in replacement:
+        return None
+    return {ord(pattern): replacement}
+
+
+def selected_vertex_indices(mesh):
+    """Indices of selected vertices in MESH datablock, read in one bulk call."""
+    vertices = mesh.vertices
+    selection = [False] * len(vertices)
+    vertices.foreach_get('select', selection)
+    return [index for index, selected in enumerate(selection) if selected]
+
+
+def merge_layers(*layer_sets):
+    """Layer flags enabled in any of LAYER_SETS, OR-ed together as bitmasks."""
+    mask = 0
+    for layers in layer_sets:
+        mask |= sum(1 << index for index, enabled in enumerate(layers) if enabled)
+    return [bool(mask & (1 << index)) for index in range(len(layer_sets[0]))]
+
+
+def ensure_mode(obj, mode):
+    """Switch active object OBJ to MODE, skipping mode_set() if it's already there."""
+    if obj.mode != mode:
+        bpy.ops.object.mode_set(mode=mode)
+
 
 class ADH_RenameRegex(Operator):
     """Renames selected objects or bones using regular expressions. Depends on re, standard library module."""
@@ -53,31 +99,44 @@ class ADH_RenameRegex(Operator):
     bl_label = 'Rename Regex'
     bl_options = {'REGISTER', 'UNDO'}
 
+    # Context member holding items to rename, for each supported mode.
+    ITEM_LISTS = {'OBJECT': 'selected_objects',
+                  'POSE': 'selected_pose_bones',
+                  'EDIT_ARMATURE': 'selected_bones'}
+
     @classmethod
     def poll(cls, context):
-        return context.selected_objects != []
+        return bool(context.selected_objects)
 
     def execute(self, context):
         props = context.scene.adh_rigging_tools
         search_str = props.regex_search_pattern
         replacement_str = props.regex_replacement_string
-        substring_re = re.compile(search_str)
-        if context.mode == 'OBJECT':
-            item_list = context.selected_objects
-        elif context.mode == 'POSE':
-            item_list = context.selected_pose_bones
-        elif context.mode == 'EDIT_ARMATURE':
-            item_list = context.selected_bones
-        else:
+        if not search_str:
+            return {'CANCELLED'}
+        mode = context.mode
+        item_list_attr = self.ITEM_LISTS.get(mode)
+        if item_list_attr is None:
             return {'CANCELLED'}
+        item_list = getattr(context, item_list_attr)
+        substring_re = compile_regex(search_str)
 
+        # Plain character swaps (e.g. "L" to "R") skip the regex engine.
+        table = literal_translation(search_str, replacement_str)
+        if table is not None:
+            rename = lambda name: name.translate(table)
+        else:
+            rename = functools.partial(substring_re.sub, replacement_str)
         for item in item_list:
-            item.name = substring_re.sub(replacement_str, item.name)
+            name = item.name
+            new_name = rename(name)
+            if new_name != name:  # Renaming is costly even to same name
+                item.name = new_name
 
         # In pose mode, operator's result won't show immediately. This
         # solves it somehow: only the View3D area will refresh
         # promptly.
-        if context.mode == 'POSE':
+        if mode == 'POSE':
             context.area.tag_redraw()
 
         return {'FINISHED'}
@@ -98,19 +157,19 @@ class ADH_AddSubdivisionSurfaceModifier(Operator):
     @classmethod
     def poll(cls, context):
         return context.mode == 'OBJECT' \
-               and context.selected_objects != []
+               and bool(context.selected_objects)
 
     def execute(self, context):
         meshes = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        show_viewport = self.show_viewport
         for obj in meshes:
-            sml = [m for m in obj.modifiers if m.type == 'SUBSURF']
-            if sml == []:
-                sm = obj.modifiers.new('Subsurf', 'SUBSURF')
-                sm.show_viewport = self.show_viewport
-                sm.show_expanded = False
-            else:
-                for sm in sml:
-                    sm.show_viewport = self.show_viewport
+            sml = [m for m in obj.modifiers if m.type == 'SUBSURF'] \
+                  or [obj.modifiers.new('Subsurf', 'SUBSURF')]
+            for sm in sml:
+                # Each write re-evaluates the object, so skip unchanged ones.
+                if sm.show_viewport != show_viewport:
+                    sm.show_viewport = show_viewport
+                if sm.show_expanded:
                     sm.show_expanded = False
 
         return {'FINISHED'}
@@ -138,10 +197,9 @@ class ADH_BindToLattice(Operator):
         objects = [o for o in context.selected_objects if o.type == 'MESH']
 
         for obj in objects:
-            lm_possibles = [m for m in obj.modifiers if
-                            m.type == 'LATTICE' and m.object == lattice]
-            if lm_possibles:
-                lm = lm_possibles[0]
+            lm = next((m for m in obj.modifiers
+                       if m.type == 'LATTICE' and m.object == lattice), None)
+            if lm is not None:
                 lm.name = lattice.name
             else:
                 lm = obj.modifiers.new(lattice.name, 'LATTICE')
@@ -165,19 +223,19 @@ class ADH_ApplyLattices(Operator):
 
     @classmethod
     def poll(cls, context):
+        obj = context.active_object
         return context.mode == 'OBJECT' \
-               and context.selected_objects != [] \
-               and context.active_object.type == 'MESH'
+               and bool(context.selected_objects) \
+               and obj is not None and obj.type == 'MESH'
 
     def execute(self, context):
         obj = context.active_object
         if obj.data.shape_keys:
-            for i in range(len(obj.data.shape_keys.key_blocks), 0, -1):
-                obj.active_shape_key_index = i - 1
-                bpy.ops.object.shape_key_remove()
-        for m in obj.modifiers:
-            if m.type == 'LATTICE':
-                bpy.ops.object.modifier_apply(modifier=m.name)
+            obj.shape_key_clear()
+        # Applying removes the modifier, so don't walk obj.modifiers itself.
+        lattice_names = [m.name for m in obj.modifiers if m.type == 'LATTICE']
+        for name in lattice_names:
+            bpy.ops.object.modifier_apply(modifier=name)
 
         return {'FINISHED'}
 
@@ -187,8 +245,8 @@ class ADH_AbstractMaskOperator:
 
     @classmethod
     def poll(cls, context):
-        return context.active_object is not None \
-               and context.active_object.type == 'MESH'
+        obj = context.active_object
+        return obj is not None and obj.type == 'MESH'
 
     orig_vg = None
 
@@ -204,6 +262,9 @@ class ADH_AbstractMaskOperator:
         mm = mesh.modifiers.get(self.MASK_NAME)
         if not mm or mm.type != 'MASK':
             mm = mesh.modifiers.new(self.MASK_NAME, 'MASK')
+        elif not (mm.show_render or mm.show_expanded) \
+                and mm.vertex_group == self.MASK_NAME:
+            return  # Already set up, spare the update tagging.
         mm.show_render = False
         mm.show_expanded = False
         mm.vertex_group = self.MASK_NAME
@@ -245,6 +306,9 @@ class ADH_MaskSelectedVertices(Operator, ADH_AbstractMaskOperator):
 
     def invoke(self, context, event):
         mesh = context.active_object
+        # Mesh data lags behind in Edit mode, so only trust it outside.
+        if mesh.mode != 'EDIT' and not mesh.data.vertices:
+            return {'CANCELLED'}
         self.save_vg(context)
 
         if event.shift:
@@ -263,8 +327,7 @@ class ADH_MaskSelectedVertices(Operator, ADH_AbstractMaskOperator):
         self.setup_mask_modifier(context)
 
         mesh.data.update()
-        selected_verts = [vert.index for vert in mesh.data.vertices
-                          if vert.select == True]
+        selected_verts = selected_vertex_indices(mesh.data)
 
         if self.action == 'add':
             if context.object.mode == 'EDIT':
@@ -290,22 +353,24 @@ class ADH_CopyCustomShapes(Operator):
 
     @classmethod
     def poll(self, context):
-        non_armatures_selected = [o.type for o in context.selected_objects
-                                  if o.type != 'ARMATURE']
-        return len(context.selected_objects) >= 2 and not non_armatures_selected
+        selected = context.selected_objects
+        return len(selected) >= 2 \
+               and not any(o.type != 'ARMATURE' for o in selected)
 
     def execute(self, context):
         src_armature = context.active_object
-        dst_armatures = context.selected_objects
-        dst_armatures.remove(src_armature)
+        dst_armatures = [o for o in context.selected_objects
+                         if o != src_armature]
 
+        dst_bone_maps = [{b.name: b for b in armature.pose.bones}
+                         for armature in dst_armatures]
         for bone in src_armature.pose.bones:
-            for armature in dst_armatures:
-                try:
-                    armature.pose.bones[bone.name].custom_shape = \
-                        bone.custom_shape
-                except:
-                    pass
+            name = bone.name
+            custom_shape = bone.custom_shape
+            for bone_map in dst_bone_maps:
+                dst_bone = bone_map.get(name)
+                if dst_bone is not None:
+                    dst_bone.custom_shape = custom_shape
 
         return {'FINISHED'}
 
@@ -321,21 +386,237 @@ class ADH_UseSameCustomShape(Operator):
         return context.active_pose_bone is not None
 
     def execute(self, context):
-        if None == context.active_pose_bone:
+        active_bone = context.active_pose_bone
+        if active_bone is None:
             return {'CANCELLED'}
 
-        custom_shape = context.active_pose_bone.custom_shape
-        for obj in context.selected_objects:
-            if obj.type == 'MESH':
-                custom_shape = obj
-                break
-
+        custom_shape = next((obj for obj in context.selected_objects
+                             if obj.type == 'MESH'), active_bone.custom_shape)
         for bone in context.selected_pose_bones:
-            bone.custom_shape = custom_shape
+            if bone.custom_shape != custom_shape:
+                bone.custom_shape = custom_shape
 
         return {'FINISHED'}
 
 
+@functools.lru_cache(maxsize=128)
+def widget_matrix(scale, pos, rot):
+    """Matrix scaling widget geometry by SCALE (x, y, z), rotating it ROT degrees
+    around X axis, then moving it POS along Y axis. Built in one step instead of
+    multiplying separate scale, rotation and translation matrices.
+
+    Frozen, since the same instance is shared by every widget created with
+    identical parameters."""
+    sx, sy, sz = scale
+    angle = math.radians(rot)
+    c, s = math.cos(angle), math.sin(angle)
+    return Matrix(((sx, 0.0, 0.0, 0.0),
+                   (0.0, c * sy, -s * sz, pos),
+                   (0.0, s * sy, c * sz, 0.0),
+                   (0.0, 0.0, 0.0, 1.0))).freeze()
+
+
+def flat_geometry(verts, edges):
+    """Flattens widget VERTS and EDGES into the sequences foreach_set() takes."""
+    return (tuple(c for co in verts for c in co),
+            tuple(i for edge in edges for i in edge))
+
+
+def fill_wire_mesh(mesh, verts, edges):
+    """Fills empty MESH with flat VERTS coordinates and EDGES vertex indices."""
+    mesh.vertices.add(len(verts) // 3)
+    mesh.vertices.foreach_set('co', verts)
+    mesh.edges.add(len(edges) // 2)
+    mesh.edges.foreach_set('vertices', edges)
+
+
+def replace_mesh_data(obj, mesh):
+    """Gives OBJ new MESH data, removing its old mesh if nothing else uses it."""
+    old_mesh = obj.data
+    obj.data = mesh
+    if isinstance(old_mesh, bpy.types.Mesh) and old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+
+
+# Unit-sized widget geometry for ADH_CreateCustomShape, scaled on creation.
+WGT_SPHERE_VERTS = ((-0.3535533845424652, -0.3535533845424652, 2.9802322387695312e-08),
+                    (-0.5, 2.1855694143368964e-08, -1.7763568394002505e-15),
+                    (-0.3535533845424652, 0.3535533845424652, -2.9802322387695312e-08),
+                    (4.371138828673793e-08, 0.5, -2.9802322387695312e-08),
+                    (-0.24999994039535522, -0.3535533845424652, 0.2500000596046448),
+                    (-0.3535533845424652, 5.960464477539063e-08, 0.35355344414711),
+                    (-0.24999994039535522, 0.3535534143447876, 0.2500000298023224),
+                    (7.968597515173315e-08, -0.3535534143447876, 0.35355344414711),
+                    (8.585823962903305e-08, 5.960464477539063e-08, 0.5000001192092896),
+                    (7.968597515173315e-08, 0.3535534143447876, 0.3535533845424652),
+                    (0.25000008940696716, -0.3535533547401428, 0.25),
+                    (0.35355350375175476, 5.960464477539063e-08, 0.3535533845424652),
+                    (0.25000008940696716, 0.3535534143447876, 0.2499999701976776),
+                    (0.3535534739494324, -0.3535534143447876, -2.9802322387695312e-08),
+                    (0.5000001192092896, 2.9802315282267955e-08, -8.429370268459024e-08),
+                    (0.3535534739494324, 0.3535533845424652, -8.940696716308594e-08),
+                    (0.2500000298023224, -0.35355344414711, -0.2500000596046448),
+                    (0.3535533845424652, 0.0, -0.35355350375175476),
+                    (0.2500000298023224, 0.35355332493782043, -0.25000011920928955),
+                    (-4.494675920341251e-08, -0.35355344414711, -0.3535534143447876),
+                    (-8.27291728455748e-08, 0.0, -0.5),
+                    (-4.494675920341251e-08, 0.3535533845424652, -0.3535534739494324),
+                    (1.2802747306750462e-08, -0.5, 0.0),
+                    (-0.25000008940696716, -0.35355344414711, -0.24999994039535522),
+                    (-0.35355350375175476, 0.0, -0.35355332493782043),
+                    (-0.25000008940696716, 0.35355332493782043, -0.25))
+
+WGT_SPHERE_EDGES = ((0, 1), (1, 2), (2, 3), (4, 5), (5, 6), (2, 6), (0, 4), (5, 1), (7, 8), (8, 9), (6, 9), (5, 8),
+                    (7, 4), (10, 11), (11, 12), (9, 12), (10, 7), (11, 8), (13, 14), (14, 15), (12, 15), (13, 10),
+                    (14, 11), (16, 17), (17, 18), (15, 18), (16, 13), (17, 14), (19, 20), (20, 21), (18, 21), (16, 19),
+                    (20, 17), (22, 23), (23, 24), (24, 25), (21, 25), (20, 24), (23, 19), (22, 0), (22, 4), (6, 3),
+                    (22, 7), (9, 3), (22, 10), (12, 3), (22, 13), (15, 3), (22, 16), (18, 3), (22, 19), (21, 3),
+                    (25, 3), (25, 2), (0, 23), (1, 24))
+
+WGT_RING_VERTS = ((0.0, 2.9802322387695312e-08, 0.5),
+                  (-0.129409521818161, 2.9802322387695312e-08, 0.4829629063606262),
+                  (-0.25, 2.9802322387695312e-08, 0.4330126941204071),
+                  (-0.3535533845424652, 2.9802322387695312e-08, 0.3535533845424652),
+                  (-0.4330127239227295, 1.4901161193847656e-08, 0.2499999850988388),
+                  (-0.4829629063606262, 1.4901161193847656e-08, 0.1294095367193222),
+                  (-0.5, 3.552713678800501e-15, 3.774895063202166e-08),
+                  (-0.4829629361629486, -1.4901161193847656e-08, -0.12940946221351624),
+                  (-0.4330127537250519, -1.4901161193847656e-08, -0.24999992549419403),
+                  (-0.3535534739494324, -2.9802322387695312e-08, -0.35355329513549805),
+                  (-0.25000011920928955, -2.9802322387695312e-08, -0.43301263451576233),
+                  (-0.12940968573093414, -2.9802322387695312e-08, -0.48296287655830383),
+                  (-1.9470718370939721e-07, -2.9802322387695312e-08, -0.5),
+                  (0.1294093132019043, -2.9802322387695312e-08, -0.482962965965271),
+                  (0.2499997913837433, -2.9802322387695312e-08, -0.43301281332969666),
+                  (0.3535532057285309, -2.9802322387695312e-08, -0.3535535931587219),
+                  (0.43301260471343994, -2.9802322387695312e-08, -0.25000014901161194),
+                  (0.48296284675598145, -1.4901161193847656e-08, -0.12940971553325653),
+                  (0.5, -1.4210854715202004e-14, -2.324561449995599e-07),
+                  (0.482962965965271, 1.4901161193847656e-08, 0.12940926849842072),
+                  (0.43301284313201904, 1.4901161193847656e-08, 0.2499997466802597),
+                  (0.3535536229610443, 2.9802322387695312e-08, 0.3535531759262085),
+                  (0.2500002980232239, 2.9802322387695312e-08, 0.43301254510879517),
+                  (0.12940987944602966, 2.9802322387695312e-08, 0.48296281695365906))
+
+WGT_RING_EDGES = ((1, 0), (2, 1), (3, 2), (4, 3), (5, 4), (6, 5), (7, 6), (8, 7), (9, 8), (10, 9), (11, 10),
+                  (12, 11), (13, 12), (14, 13), (15, 14), (16, 15), (17, 16), (18, 17), (19, 18), (20, 19), (21, 20),
+                  (22, 21), (23, 22), (0, 23))
+
+WGT_SQUARE_VERTS = ((0.5, -0.5, 0.0), (-0.5, -0.5, 0.0),
+                    (0.5, 0.5, 0.0), (-0.5, 0.5, 0.0))
+
+WGT_SQUARE_EDGES = ((0, 1), (2, 3), (0, 2), (3, 1))
+
+WGT_TRIANGLE_VERTS = ((0.0, 0.0, 0.0), (0.6, 1.0, 0.0), (-0.6, 1.0, 0.0))
+
+WGT_TRIANGLE_EDGES = ((1, 2), (0, 1), (2, 0))
+
+WGT_BIDIRECTION_VERTS = ((0.0, -0.5, 0.0), (0.0, 0.5, 0.0),
+                         (0.15000000596046448, -0.3499999940395355, 0.0),
+                         (-0.15000000596046448, 0.3499999940395355, 0.0),
+                         (0.15000000596046448, 0.3499999940395355, 0.0),
+                         (-0.15000000596046448, -0.3499999940395355, 0.0))
+
+WGT_BIDIRECTION_EDGES = ((2, 0), (4, 1), (5, 0), (3, 1), (0, 1))
+
+WGT_BOX_VERTS = ((-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (0.5, 0.5, -0.5),
+                 (0.5, -0.5, -0.5), (-0.5, -0.5, 0.5), (-0.5, 0.5, 0.5),
+                 (0.5, 0.5, 0.5), (0.5, -0.5, 0.5))
+
+WGT_BOX_EDGES = ((4, 5), (5, 1), (1, 0), (0, 4), (5, 6), (6, 2), (2, 1), (6, 7), (7, 3), (3, 2), (7, 4), (0, 3))
+
+WGT_FOURWAYS_VERTS = ((0.5829628705978394, -1.4901161193847656e-08, 0.12940971553325653),
+                      (-0.129409521818161, 2.9802322387695312e-08, -0.4829629063606262),
+                      (-0.25, 2.9802322387695312e-08, -0.4330126941204071),
+                      (-0.3535533845424652, 2.9802322387695312e-08, -0.3535533845424652),
+                      (-0.4330127239227295, 1.4901161193847656e-08, -0.2499999850988388),
+                      (-0.4829629063606262, 1.4901161193847656e-08, -0.1294095367193222),
+                      (0.5829629898071289, 1.4901161193847656e-08, -0.12940926849842072),
+                      (-0.4829629361629486, -1.4901161193847656e-08, 0.12940946221351624),
+                      (-0.4330127537250519, -1.4901161193847656e-08, 0.24999992549419403),
+                      (-0.3535534739494324, -2.9802322387695312e-08, 0.35355329513549805),
+                      (-0.25000011920928955, -2.9802322387695312e-08, 0.43301263451576233),
+                      (-0.12940968573093414, -2.9802322387695312e-08, 0.48296287655830383),
+                      (-0.12940968573093414, -2.9802322387695312e-08, 0.5829628705978394),
+                      (0.1294093132019043, -2.9802322387695312e-08, 0.482962965965271),
+                      (0.2499997913837433, -2.9802322387695312e-08, 0.43301281332969666),
+                      (0.3535532057285309, -2.9802322387695312e-08, 0.3535535931587219),
+                      (0.43301260471343994, -2.9802322387695312e-08, 0.25000014901161194),
+                      (0.48296284675598145, -1.4901161193847656e-08, 0.12940971553325653),
+                      (0.1294093132019043, -2.9802322387695312e-08, 0.5829629898071289),
+                      (0.482962965965271, 1.4901161193847656e-08, -0.12940926849842072),
+                      (0.43301284313201904, 1.4901161193847656e-08, -0.2499997466802597),
+                      (0.3535536229610443, 2.9802322387695312e-08, -0.3535531759262085),
+                      (0.2500002980232239, 2.9802322387695312e-08, -0.43301254510879517),
+                      (0.12940987944602966, 2.9802322387695312e-08, -0.48296281695365906),
+                      (-0.1941145956516266, -2.9802322387695312e-08, 0.5829629898071289),
+                      (-2.102837726170037e-07, -3.218650945768786e-08, 0.7560000419616699),
+                      (0.19411394000053406, -2.9802322387695312e-08, 0.5829629898071289),
+                      (0.5829628705978394, -1.4901161193847656e-08, 0.1941145360469818),
+                      (0.7560000419616699, -1.5347723702281886e-14, 2.5105265422098455e-07),
+                      (0.5829629898071289, 1.4901161193847656e-08, -0.19411394000053406),
+                      (-0.5829628705978394, 1.4901161193847656e-08, -0.19411435723304749),
+                      (-0.7560000419616699, 3.8369309255704715e-15, -4.076887094583981e-08),
+                      (-0.5829629302024841, -1.4901161193847656e-08, 0.19411414861679077),
+                      (0.0, 3.218650945768786e-08, -0.7560000419616699),
+                      (-0.1941143274307251, 2.9802322387695312e-08, -0.5829628109931946),
+                      (0.1941147744655609, 2.9802322387695312e-08, -0.5829628109931946),
+                      (-0.5829629302024841, -1.4901161193847656e-08, 0.12940946221351624),
+                      (-0.5829628705978394, 1.4901161193847656e-08, -0.1294095367193222),
+                      (0.12940987944602966, 2.9802322387695312e-08, -0.5829628109931946),
+                      (-0.129409521818161, 2.9802322387695312e-08, -0.5829628705978394))
+
+WGT_FOURWAYS_EDGES = ((2, 1), (3, 2), (4, 3), (5, 4), (8, 7), (9, 8), (10, 9), (11, 10), (39, 34), (14, 13), (15, 14),
+                      (16, 15), (17, 16), (38, 23), (37, 5), (20, 19), (21, 20), (22, 21), (23, 22), (36, 32), (25, 24),
+                      (26, 25), (0, 17), (18, 13), (12, 24), (28, 27), (29, 28), (6, 29), (6, 19), (0, 27), (31, 30),
+                      (32, 31), (12, 11), (36, 7), (37, 30), (34, 33), (33, 35), (38, 35), (18, 26), (39, 1))
+
+WGT_FOURGAPS_VERTS = ((-0.1941143274307251, 2.9802322387695312e-08, -0.5829628109931946),
+                      (-0.30721572041511536, 3.6622967769517345e-08, -0.532113254070282),
+                      (-0.4344686269760132, 3.6622967769517345e-08, -0.4344686269760132),
+                      (-0.532113254070282, 1.8311483884758673e-08, -0.30721569061279297),
+                      (-0.5829628705978394, 1.4901161193847656e-08, -0.19411435723304749),
+                      (-0.5829629302024841, -1.4901161193847656e-08, 0.19411414861679077),
+                      (-0.5321133136749268, -1.8311483884758673e-08, 0.3072156310081482),
+                      (-0.43446874618530273, -3.6622967769517345e-08, 0.43446850776672363),
+                      (-0.3072158396244049, -3.6622967769517345e-08, 0.5321131348609924),
+                      (-0.1941145956516266, -2.9802322387695312e-08, 0.5829629898071289),
+                      (0.19411394000053406, -2.9802322387695312e-08, 0.5829629898071289),
+                      (0.30721548199653625, -3.6622967769517345e-08, 0.5321133732795715),
+                      (0.4344683885574341, -3.6622967769517345e-08, 0.4344688653945923),
+                      (0.5321131348609924, -3.6622967769517345e-08, 0.3072158992290497),
+                      (0.5829628705978394, -1.4901161193847656e-08, 0.1941145360469818),
+                      (0.5829629898071289, 1.4901161193847656e-08, -0.19411394000053406),
+                      (0.5321133732795715, 1.8311483884758673e-08, -0.3072154223918915),
+                      (0.43446895480155945, 3.6622967769517345e-08, -0.4344683885574341),
+                      (0.307216078042984, 3.6622967769517345e-08, -0.5321130156517029),
+                      (0.1941147744655609, 2.9802322387695312e-08, -0.5829628109931946))
+
+WGT_FOURGAPS_EDGES = ((1, 0), (2, 1), (3, 2), (4, 3), (6, 5), (7, 6), (8, 7), (9, 8), (11, 10), (12, 11), (13, 12),
+                      (14, 13), (16, 15), (17, 16), (18, 17), (19, 18))
+
+# Flattened once, so creating a widget skips from_pydata()'s per-call unpacking.
+WGT_SPHERE = flat_geometry(WGT_SPHERE_VERTS, WGT_SPHERE_EDGES)
+WGT_RING = flat_geometry(WGT_RING_VERTS, WGT_RING_EDGES)
+WGT_SQUARE = flat_geometry(WGT_SQUARE_VERTS, WGT_SQUARE_EDGES)
+WGT_TRIANGLE = flat_geometry(WGT_TRIANGLE_VERTS, WGT_TRIANGLE_EDGES)
+WGT_BIDIRECTION = flat_geometry(WGT_BIDIRECTION_VERTS, WGT_BIDIRECTION_EDGES)
+WGT_BOX = flat_geometry(WGT_BOX_VERTS, WGT_BOX_EDGES)
+WGT_FOURWAYS = flat_geometry(WGT_FOURWAYS_VERTS, WGT_FOURWAYS_EDGES)
+WGT_FOURGAPS = flat_geometry(WGT_FOURGAPS_VERTS, WGT_FOURGAPS_EDGES)
+
+# Geometry for each ADH_CreateCustomShape.widget_shape, and whether its depth
+# along bone's Y axis stays fixed instead of following widget size.
+WIDGET_SHAPES = {'sphere': (WGT_SPHERE, False),
+                 'ring': (WGT_RING, False),
+                 'square': (WGT_SQUARE, False),
+                 'triangle': (WGT_TRIANGLE, False),
+                 'bidirection': (WGT_BIDIRECTION, False),
+                 'box': (WGT_BOX, True),
+                 'fourways': (WGT_FOURWAYS, True),
+                 'fourgaps': (WGT_FOURGAPS, True)}
+
+
 class ADH_CreateCustomShape(Operator):
     """Creates mesh for custom shape for selected bones, at active bone's position, using its name as suffix."""
     bl_idname = 'armature.adh_create_shape'
@@ -390,7 +671,7 @@ class ADH_CreateCustomShape(Operator):
         description="Object layers where new widgets will be placed",
         subtype='LAYER',
         size=20,
-        default=[x == 19 for x in range(0, 20)],
+        default=OBJ_LAYERS_19,
     )
 
     @classmethod
@@ -426,9 +707,9 @@ class ADH_CreateCustomShape(Operator):
         matrix_wgt = matrix_bone.inverted() * matrix_src
         widget_data.transform(matrix_wgt)
 
-        if obj_name in scene.objects:
-            obj = scene.objects[obj_name]
-            obj.data = widget_data
+        obj = bpy.data.objects.get(obj_name)
+        if obj is not None and obj.name in scene.objects:
+            replace_mesh_data(obj, widget_data)
         else:
             obj = bpy.data.objects.new(obj_name, widget_data)
             obj.layers = self.widget_layers
@@ -447,9 +728,9 @@ class ADH_CreateCustomShape(Operator):
         scene = bpy.context.scene
         # Check if it already exists
         mesh = bpy.data.meshes.new(obj_name)
-        if obj_name in scene.objects:
-            obj = scene.objects[obj_name]
-            obj.data = mesh
+        obj = bpy.data.objects.get(obj_name)
+        if obj is not None and obj.name in scene.objects:
+            replace_mesh_data(obj, mesh)
         else:
             obj = bpy.data.objects.new(obj_name, mesh)
             scene.objects.link(obj)
@@ -459,286 +740,16 @@ class ADH_CreateCustomShape(Operator):
 
         return obj
 
-    # --------------- Long, boring widget creation functions ---------------
-
-    def create_sphere_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
+    def create_shape_widget(self, rig, bone_name, geometry, fixed_depth,
+                            size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
         obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj != None:
-            verts = [(-0.3535533845424652 * size, -0.3535533845424652 * size, 2.9802322387695312e-08 * size),
-                     (-0.5 * size, 2.1855694143368964e-08 * size, -1.7763568394002505e-15 * size),
-                     (-0.3535533845424652 * size, 0.3535533845424652 * size, -2.9802322387695312e-08 * size),
-                     (4.371138828673793e-08 * size, 0.5 * size, -2.9802322387695312e-08 * size),
-                     (-0.24999994039535522 * size, -0.3535533845424652 * size, 0.2500000596046448 * size),
-                     (-0.3535533845424652 * size, 5.960464477539063e-08 * size, 0.35355344414711 * size),
-                     (-0.24999994039535522 * size, 0.3535534143447876 * size, 0.2500000298023224 * size),
-                     (7.968597515173315e-08 * size, -0.3535534143447876 * size, 0.35355344414711 * size),
-                     (8.585823962903305e-08 * size, 5.960464477539063e-08 * size, 0.5000001192092896 * size),
-                     (7.968597515173315e-08 * size, 0.3535534143447876 * size, 0.3535533845424652 * size),
-                     (0.25000008940696716 * size, -0.3535533547401428 * size, 0.25 * size),
-                     (0.35355350375175476 * size, 5.960464477539063e-08 * size, 0.3535533845424652 * size),
-                     (0.25000008940696716 * size, 0.3535534143447876 * size, 0.2499999701976776 * size),
-                     (0.3535534739494324 * size, -0.3535534143447876 * size, -2.9802322387695312e-08 * size),
-                     (0.5000001192092896 * size, 2.9802315282267955e-08 * size, -8.429370268459024e-08 * size),
-                     (0.3535534739494324 * size, 0.3535533845424652 * size, -8.940696716308594e-08 * size),
-                     (0.2500000298023224 * size, -0.35355344414711 * size, -0.2500000596046448 * size),
-                     (0.3535533845424652 * size, 0.0 * size, -0.35355350375175476 * size),
-                     (0.2500000298023224 * size, 0.35355332493782043 * size, -0.25000011920928955 * size),
-                     (-4.494675920341251e-08 * size, -0.35355344414711 * size, -0.3535534143447876 * size),
-                     (-8.27291728455748e-08 * size, 0.0 * size, -0.5 * size),
-                     (-4.494675920341251e-08 * size, 0.3535533845424652 * size, -0.3535534739494324 * size),
-                     (1.2802747306750462e-08 * size, -0.5 * size, 0.0 * size),
-                     (-0.25000008940696716 * size, -0.35355344414711 * size, -0.24999994039535522 * size),
-                     (-0.35355350375175476 * size, 0.0 * size, -0.35355332493782043 * size),
-                     (-0.25000008940696716 * size, 0.35355332493782043 * size, -0.25 * size), ]
-            edges = [(0, 1), (1, 2), (2, 3), (4, 5), (5, 6), (2, 6), (0, 4), (5, 1), (7, 8), (8, 9), (6, 9), (5, 8),
-                     (7, 4), (10, 11), (11, 12), (9, 12), (10, 7), (11, 8), (13, 14), (14, 15), (12, 15), (13, 10),
-                     (14, 11), (16, 17), (17, 18), (15, 18), (16, 13), (17, 14), (19, 20), (20, 21), (18, 21), (16, 19),
-                     (20, 17), (22, 23), (23, 24), (24, 25), (21, 25), (20, 24), (23, 19), (22, 0), (22, 4), (6, 3),
-                     (22, 7), (9, 3), (22, 10), (12, 3), (22, 13), (15, 3), (22, 16), (18, 3), (22, 19), (21, 3),
-                     (25, 3), (25, 2), (0, 23), (1, 24), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
+        mat = widget_matrix((size, 1.0 if fixed_depth else size, size), pos, rot)
 
-    def create_ring_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
-        obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj != None:
-
-            verts = [(0.0 * size, 2.9802322387695312e-08 * size, 0.5 * size),
-                     (-0.129409521818161 * size, 2.9802322387695312e-08 * size, 0.4829629063606262 * size),
-                     (-0.25 * size, 2.9802322387695312e-08 * size, 0.4330126941204071 * size),
-                     (-0.3535533845424652 * size, 2.9802322387695312e-08 * size, 0.3535533845424652 * size),
-                     (-0.4330127239227295 * size, 1.4901161193847656e-08 * size, 0.2499999850988388 * size),
-                     (-0.4829629063606262 * size, 1.4901161193847656e-08 * size, 0.1294095367193222 * size),
-                     (-0.5 * size, 3.552713678800501e-15 * size, 3.774895063202166e-08 * size),
-                     (-0.4829629361629486 * size, -1.4901161193847656e-08 * size, -0.12940946221351624 * size),
-                     (-0.4330127537250519 * size, -1.4901161193847656e-08 * size, -0.24999992549419403 * size),
-                     (-0.3535534739494324 * size, -2.9802322387695312e-08 * size, -0.35355329513549805 * size),
-                     (-0.25000011920928955 * size, -2.9802322387695312e-08 * size, -0.43301263451576233 * size),
-                     (-0.12940968573093414 * size, -2.9802322387695312e-08 * size, -0.48296287655830383 * size),
-                     (-1.9470718370939721e-07 * size, -2.9802322387695312e-08 * size, -0.5 * size),
-                     (0.1294093132019043 * size, -2.9802322387695312e-08 * size, -0.482962965965271 * size),
-                     (0.2499997913837433 * size, -2.9802322387695312e-08 * size, -0.43301281332969666 * size),
-                     (0.3535532057285309 * size, -2.9802322387695312e-08 * size, -0.3535535931587219 * size),
-                     (0.43301260471343994 * size, -2.9802322387695312e-08 * size, -0.25000014901161194 * size),
-                     (0.48296284675598145 * size, -1.4901161193847656e-08 * size, -0.12940971553325653 * size),
-                     (0.5 * size, -1.4210854715202004e-14 * size, -2.324561449995599e-07 * size),
-                     (0.482962965965271 * size, 1.4901161193847656e-08 * size, 0.12940926849842072 * size),
-                     (0.43301284313201904 * size, 1.4901161193847656e-08 * size, 0.2499997466802597 * size),
-                     (0.3535536229610443 * size, 2.9802322387695312e-08 * size, 0.3535531759262085 * size),
-                     (0.2500002980232239 * size, 2.9802322387695312e-08 * size, 0.43301254510879517 * size),
-                     (0.12940987944602966 * size, 2.9802322387695312e-08 * size, 0.48296281695365906 * size), ]
-            edges = [(1, 0), (2, 1), (3, 2), (4, 3), (5, 4), (6, 5), (7, 6), (8, 7), (9, 8), (10, 9), (11, 10),
-                     (12, 11), (13, 12), (14, 13), (15, 14), (16, 15), (17, 16), (18, 17), (19, 18), (20, 19), (21, 20),
-                     (22, 21), (23, 22), (0, 23), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
-
-    def create_square_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
-        obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj != None:
-            verts = [(0.5 * size, -0.5 * size, 0.0 * size), (-0.5 * size, -0.5 * size, 0.0 * size),
-                     (0.5 * size, 0.5 * size, 0.0 * size), (-0.5 * size, 0.5 * size, 0.0 * size), ]
-            edges = [(0, 1), (2, 3), (0, 2), (3, 1), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
-
-    def create_triangle_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
-        obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj is not None:
-            verts = [(0.0 * size, 0.0 * size, 0.0), (0.6 * size, 1.0 * size, 0.0), (-0.6 * size, 1.0 * size, 0.0), ]
-            edges = [(1, 2), (0, 1), (2, 0), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
-
-    def create_bidirection_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
-        obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj != None:
-            verts = [(0.0 * size, -0.5 * size, 0.0 * size), (0.0 * size, 0.5 * size, 0.0 * size),
-                     (0.15000000596046448 * size, -0.3499999940395355 * size, 0.0 * size),
-                     (-0.15000000596046448 * size, 0.3499999940395355 * size, 0.0 * size),
-                     (0.15000000596046448 * size, 0.3499999940395355 * size, 0.0 * size),
-                     (-0.15000000596046448 * size, -0.3499999940395355 * size, 0.0 * size), ]
-            edges = [(2, 0), (4, 1), (5, 0), (3, 1), (0, 1), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
-
-    def create_box_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
-        obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj != None:
-            verts = [(-0.5 * size, -0.5, -0.5 * size), (-0.5 * size, 0.5, -0.5 * size), (0.5 * size, 0.5, -0.5 * size),
-                     (0.5 * size, -0.5, -0.5 * size), (-0.5 * size, -0.5, 0.5 * size), (-0.5 * size, 0.5, 0.5 * size),
-                     (0.5 * size, 0.5, 0.5 * size), (0.5 * size, -0.5, 0.5 * size), ]
-            edges = [(4, 5), (5, 1), (1, 0), (0, 4), (5, 6), (6, 2), (2, 1), (6, 7), (7, 3), (3, 2), (7, 4), (0, 3), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
-
-    def create_fourways_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
-        obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj != None:
-            verts = [(0.5829628705978394 * size, -1.4901161193847656e-08, 0.12940971553325653 * size),
-                     (-0.129409521818161 * size, 2.9802322387695312e-08, -0.4829629063606262 * size),
-                     (-0.25 * size, 2.9802322387695312e-08, -0.4330126941204071 * size),
-                     (-0.3535533845424652 * size, 2.9802322387695312e-08, -0.3535533845424652 * size),
-                     (-0.4330127239227295 * size, 1.4901161193847656e-08, -0.2499999850988388 * size),
-                     (-0.4829629063606262 * size, 1.4901161193847656e-08, -0.1294095367193222 * size),
-                     (0.5829629898071289 * size, 1.4901161193847656e-08, -0.12940926849842072 * size),
-                     (-0.4829629361629486 * size, -1.4901161193847656e-08, 0.12940946221351624 * size),
-                     (-0.4330127537250519 * size, -1.4901161193847656e-08, 0.24999992549419403 * size),
-                     (-0.3535534739494324 * size, -2.9802322387695312e-08, 0.35355329513549805 * size),
-                     (-0.25000011920928955 * size, -2.9802322387695312e-08, 0.43301263451576233 * size),
-                     (-0.12940968573093414 * size, -2.9802322387695312e-08, 0.48296287655830383 * size),
-                     (-0.12940968573093414 * size, -2.9802322387695312e-08, 0.5829628705978394 * size),
-                     (0.1294093132019043 * size, -2.9802322387695312e-08, 0.482962965965271 * size),
-                     (0.2499997913837433 * size, -2.9802322387695312e-08, 0.43301281332969666 * size),
-                     (0.3535532057285309 * size, -2.9802322387695312e-08, 0.3535535931587219 * size),
-                     (0.43301260471343994 * size, -2.9802322387695312e-08, 0.25000014901161194 * size),
-                     (0.48296284675598145 * size, -1.4901161193847656e-08, 0.12940971553325653 * size),
-                     (0.1294093132019043 * size, -2.9802322387695312e-08, 0.5829629898071289 * size),
-                     (0.482962965965271 * size, 1.4901161193847656e-08, -0.12940926849842072 * size),
-                     (0.43301284313201904 * size, 1.4901161193847656e-08, -0.2499997466802597 * size),
-                     (0.3535536229610443 * size, 2.9802322387695312e-08, -0.3535531759262085 * size),
-                     (0.2500002980232239 * size, 2.9802322387695312e-08, -0.43301254510879517 * size),
-                     (0.12940987944602966 * size, 2.9802322387695312e-08, -0.48296281695365906 * size),
-                     (-0.1941145956516266 * size, -2.9802322387695312e-08, 0.5829629898071289 * size),
-                     (-2.102837726170037e-07 * size, -3.218650945768786e-08, 0.7560000419616699 * size),
-                     (0.19411394000053406 * size, -2.9802322387695312e-08, 0.5829629898071289 * size),
-                     (0.5829628705978394 * size, -1.4901161193847656e-08, 0.1941145360469818 * size),
-                     (0.7560000419616699 * size, -1.5347723702281886e-14, 2.5105265422098455e-07 * size),
-                     (0.5829629898071289 * size, 1.4901161193847656e-08, -0.19411394000053406 * size),
-                     (-0.5829628705978394 * size, 1.4901161193847656e-08, -0.19411435723304749 * size),
-                     (-0.7560000419616699 * size, 3.8369309255704715e-15, -4.076887094583981e-08 * size),
-                     (-0.5829629302024841 * size, -1.4901161193847656e-08, 0.19411414861679077 * size),
-                     (0.0 * size, 3.218650945768786e-08, -0.7560000419616699 * size),
-                     (-0.1941143274307251 * size, 2.9802322387695312e-08, -0.5829628109931946 * size),
-                     (0.1941147744655609 * size, 2.9802322387695312e-08, -0.5829628109931946 * size),
-                     (-0.5829629302024841 * size, -1.4901161193847656e-08, 0.12940946221351624 * size),
-                     (-0.5829628705978394 * size, 1.4901161193847656e-08, -0.1294095367193222 * size),
-                     (0.12940987944602966 * size, 2.9802322387695312e-08, -0.5829628109931946 * size),
-                     (-0.129409521818161 * size, 2.9802322387695312e-08, -0.5829628705978394 * size), ]
-            edges = [(2, 1), (3, 2), (4, 3), (5, 4), (8, 7), (9, 8), (10, 9), (11, 10), (39, 34), (14, 13), (15, 14),
-                     (16, 15), (17, 16), (38, 23), (37, 5), (20, 19), (21, 20), (22, 21), (23, 22), (36, 32), (25, 24),
-                     (26, 25), (0, 17), (18, 13), (12, 24), (28, 27), (29, 28), (6, 29), (6, 19), (0, 27), (31, 30),
-                     (32, 31), (12, 11), (36, 7), (37, 30), (34, 33), (33, 35), (38, 35), (18, 26), (39, 1), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
-
-    def create_fourgaps_widget(self, rig, bone_name, size=1.0, pos=1.0, rot=0.0, bone_transform_name=None):
-        obj = self.create_widget(rig, bone_name, bone_transform_name)
-        if obj != None:
-            verts = [(-0.1941143274307251 * size, 2.9802322387695312e-08, -0.5829628109931946 * size),
-                     (-0.30721572041511536 * size, 3.6622967769517345e-08, -0.532113254070282 * size),
-                     (-0.4344686269760132 * size, 3.6622967769517345e-08, -0.4344686269760132 * size),
-                     (-0.532113254070282 * size, 1.8311483884758673e-08, -0.30721569061279297 * size),
-                     (-0.5829628705978394 * size, 1.4901161193847656e-08, -0.19411435723304749 * size),
-                     (-0.5829629302024841 * size, -1.4901161193847656e-08, 0.19411414861679077 * size),
-                     (-0.5321133136749268 * size, -1.8311483884758673e-08, 0.3072156310081482 * size),
-                     (-0.43446874618530273 * size, -3.6622967769517345e-08, 0.43446850776672363 * size),
-                     (-0.3072158396244049 * size, -3.6622967769517345e-08, 0.5321131348609924 * size),
-                     (-0.1941145956516266 * size, -2.9802322387695312e-08, 0.5829629898071289 * size),
-                     (0.19411394000053406 * size, -2.9802322387695312e-08, 0.5829629898071289 * size),
-                     (0.30721548199653625 * size, -3.6622967769517345e-08, 0.5321133732795715 * size),
-                     (0.4344683885574341 * size, -3.6622967769517345e-08, 0.4344688653945923 * size),
-                     (0.5321131348609924 * size, -3.6622967769517345e-08, 0.3072158992290497 * size),
-                     (0.5829628705978394 * size, -1.4901161193847656e-08, 0.1941145360469818 * size),
-                     (0.5829629898071289 * size, 1.4901161193847656e-08, -0.19411394000053406 * size),
-                     (0.5321133732795715 * size, 1.8311483884758673e-08, -0.3072154223918915 * size),
-                     (0.43446895480155945 * size, 3.6622967769517345e-08, -0.4344683885574341 * size),
-                     (0.307216078042984 * size, 3.6622967769517345e-08, -0.5321130156517029 * size),
-                     (0.1941147744655609 * size, 2.9802322387695312e-08, -0.5829628109931946 * size), ]
-            edges = [(1, 0), (2, 1), (3, 2), (4, 3), (6, 5), (7, 6), (8, 7), (9, 8), (11, 10), (12, 11), (13, 12),
-                     (14, 13), (16, 15), (17, 16), (18, 17), (19, 18), ]
-            faces = []
-            rot_mat = Matrix.Rotation(math.radians(rot), 4, 'X')
-            trans_mat = Matrix.Translation(Vector((0.0, pos, 0.0)))
-            mat = trans_mat * rot_mat
-
-            mesh = obj.data
-            mesh.from_pydata(verts, edges, faces)
-            mesh.transform(mat)
-            mesh.update()
-            mesh.update()
-            return obj
-        else:
-            return None
-
-    # ------------ End of long, boring widget creation functions -----------
+        mesh = obj.data
+        fill_wire_mesh(mesh, *geometry)
+        mesh.transform(mat)
+        mesh.update()
+        return obj
 
     def execute(self, context):
         rig = context.active_object
@@ -746,15 +757,18 @@ class ADH_CreateCustomShape(Operator):
         scene = context.scene
 
         widget = None
-        widget_srcs = [obj for obj in context.selected_objects
-                       if obj.type == 'MESH']
-
-        func = getattr(self, "create_%s_widget" % self.widget_shape, None)
-        if func == None and len(widget_srcs) == 1:
-            widget = self.create_widget_from_object(rig, bone, widget_srcs[0])
+        shape = WIDGET_SHAPES.get(self.widget_shape)
+        if shape is not None:
+            widget = self.create_shape_widget(rig, bone.name, *shape,
+                                              size=self.widget_size,
+                                              pos=self.widget_pos,
+                                              rot=self.widget_rot)
         else:
-            widget = func(rig, bone.name,
-                          self.widget_size, self.widget_pos, self.widget_rot)
+            widget_srcs = [obj for obj in context.selected_objects
+                           if obj.type == 'MESH']
+            if len(widget_srcs) != 1:
+                return {'CANCELLED'}
+            widget = self.create_widget_from_object(rig, bone, widget_srcs[0])
 
         for bone in context.selected_pose_bones:
             bone.custom_shape = widget
@@ -773,22 +787,24 @@ class ADH_SelectCustomShape(Operator):
 
     @classmethod
     def poll(self, context):
-        return context.active_pose_bone is not None and \
-               context.active_pose_bone.custom_shape is not None
+        bone = context.active_pose_bone
+        return bone is not None and bone.custom_shape is not None
 
     def execute(self, context):
         bone = context.active_pose_bone
         bone_shape = bone.custom_shape
-        shape_layers = [l for l in bone_shape.layers]  # can't index on bpy_prop_array
-        if bone_shape:
-            context.active_object.select = False
-            bone_shape.hide = False
-            bone_shape.select = True
-            context.scene.layers[shape_layers.index(True)] = True
-            context.scene.objects.active = bone.custom_shape
-        else:
+        if not bone_shape:
             return {'CANCELLED'}
 
+        context.active_object.select = False
+        bone_shape.hide = False
+        bone_shape.select = True
+        shape_layer = next((i for i, l in enumerate(bone_shape.layers) if l),
+                           None)
+        if shape_layer is not None:
+            context.scene.layers[shape_layer] = True
+        context.scene.objects.active = bone_shape
+
         return {'FINISHED'}
 
 
@@ -803,85 +819,111 @@ class ADH_CreateHooks(Operator):
         description="Armature layers where new hooks will be placed",
         subtype='LAYER',
         size=32,
-        default=[x == 30 for x in range(0, 32)]
+        default=ARM_LAYERS_30
     )
 
     invoked = False
 
-    def setup_copy_constraint(self, armature, bone_name):
-        bone = armature.pose.bones[bone_name]
+    def setup_copy_constraint(self, armature, bone):
         ct_constraint = bone.constraints.new('COPY_TRANSFORMS')
-        ct_constraint.owner_space = 'LOCAL'
-        ct_constraint.target_space = 'LOCAL'
+        ct_constraint.owner_space = ct_constraint.target_space = 'LOCAL'
         ct_constraint.target = armature
-        ct_constraint.subtarget = PRF_HOOK + bone_name
+        ct_constraint.subtarget = PRF_HOOK + bone.name
 
     def hook_on_lattice(self, context, lattice, armature):
+        # Mode switches are the expensive part here. Point data is read once
+        # in object mode, then armature and lattice each get a single edit
+        # session; ensure_mode() skips switches the object doesn't need.
         objects = context.scene.objects
 
         prev_lattice_mode = lattice.mode
-        bpy.ops.object.mode_set(mode='OBJECT')  # Needed for matrix calculation
+        ensure_mode(lattice, 'OBJECT')  # Needed for matrix calculation
 
-        armature_mat_inv = armature.matrix_world.inverted()
-        lattice_mat = lattice.matrix_world
+        # Lattice to armature space, combined once instead of per point.
+        lattice_to_armature_mat = armature.matrix_world.inverted() * \
+                                  lattice.matrix_world
 
         def global_lat_point_co(p):
-            return armature_mat_inv * (lattice_mat * p)
+            return lattice_to_armature_mat * p
 
         def get_selected_points(lat):
             return [point for point in lat.data.points if point.select]
 
         lattice_pos = get_selected_points(lattice)
         bone_pos = [global_lat_point_co(point.co) for point in lattice_pos]
+        name_prefix = "%s%s." % (PRF_HOOK, lattice.name)
         bone_names = [
-            "%(prefix)s%(lat)s.%(index)d%(suffix)s" %
-            dict(prefix=PRF_HOOK, lat=lattice.name, index=index,
-                 suffix=".R" if global_lat_point_co(point).x < 0 \
-                     else ".L" if point.x > 0 else "")
+            "%s%d%s" % (name_prefix, index,
+                        ".R" if point.x < 0 else ".L" if point.x > 0 else "")
             for index, point in enumerate(bone_pos)]
 
         objects.active = armature
         prev_mode = armature.mode
-        bpy.ops.object.mode_set(mode='EDIT')
+        ensure_mode(armature, 'EDIT')
+        edit_bones = armature.data.edit_bones
+        bone_matrices = []
         for index, point_co in enumerate(bone_pos):
             bone_name = bone_names[index]
-            bone = armature.data.edit_bones.new(bone_name)
+            bone = edit_bones.new(bone_name)
             bone.head = point_co
             bone.tail = point_co + Vector([0, 0, BBONE_BASE_SIZE * 5])
             bone.bbone_x = BBONE_BASE_SIZE
             bone.bbone_z = BBONE_BASE_SIZE
             bone.layers = self.hook_layers
             bone.use_deform = False
-        armature.data.layers = list(
-            map(any, zip(armature.data.layers, self.hook_layers)))
-        bpy.ops.object.mode_set(mode=prev_mode)
+            bone_matrices.append(bone.matrix.copy())
+        armature.data.layers = merge_layers(armature.data.layers,
+                                            self.hook_layers)
+        ensure_mode(armature, prev_mode)
 
         objects.active = lattice
-        bpy.ops.object.mode_set(mode='EDIT')
+        hook_mods = []
+        for bone_name in bone_names:
+            mod = lattice.modifiers.new(bone_name, 'HOOK')
+            mod.object = armature
+            mod.subtarget = bone_name
+            hook_mods.append(mod)
+
+        if hook_mods and hasattr(hook_mods[0], 'vertex_indices_set'):
+            # Same result as hook_assign + hook_reset, without an edit
+            # session and two operator calls per point.
+            points = lattice.data.points
+            point_indices = [index for index, point in enumerate(points)
+                             if point.select]
+            for mod, bone_mat, index in zip(hook_mods, bone_matrices,
+                                            point_indices):
+                mod.vertex_indices_set([index])
+                mod.center = points[index].co_deform
+                mod.matrix_inverse = (armature.matrix_world * bone_mat).inverted() * \
+                                     lattice.matrix_world
+            ensure_mode(lattice, prev_lattice_mode)
+            return {'FINISHED'}
+
+        ensure_mode(lattice, 'EDIT')
         selected_points = get_selected_points(lattice)  # previous one lost after toggling
         for point in selected_points:
             point.select = False
         for index, point in enumerate(selected_points):
             bone_name = bone_names[index]
-            mod = lattice.modifiers.new(bone_name, 'HOOK')
-            mod.object = armature
-            mod.subtarget = bone_name
             point.select = True
             bpy.ops.object.hook_assign(modifier=bone_name)
             bpy.ops.object.hook_reset(modifier=bone_name)
             point.select = False
         for point in selected_points:
             point.select = True
-        bpy.ops.object.mode_set(mode=prev_lattice_mode)
+        ensure_mode(lattice, prev_lattice_mode)
 
         return {'FINISHED'}
 
     def hook_on_bone(self, context, armature):
         prev_mode = armature.mode
-        bpy.ops.object.mode_set(mode='EDIT')
-        for bone in context.selected_bones:
+        ensure_mode(armature, 'EDIT')
+        selected_bones = context.selected_bones
+        bone_names = [bone.name for bone in selected_bones]
+        edit_bones = armature.data.edit_bones
+        for bone in selected_bones:
             hook_name = PRF_HOOK + bone.name
-            hook = armature.data.edit_bones.new(hook_name)
+            hook = edit_bones.new(hook_name)
             hook.head = bone.head
             hook.tail = bone.tail
             hook.bbone_x = bone.bbone_x * 2
@@ -890,17 +932,21 @@ class ADH_CreateHooks(Operator):
             hook.use_deform = False
             hook.roll = bone.roll
             hook.parent = bone.parent
-        bpy.ops.object.mode_set(mode='POSE')
-        for bone in context.selected_pose_bones:
-            self.setup_copy_constraint(armature, bone.name)
-        bpy.ops.object.mode_set(mode=prev_mode)
+        # Pose bones for the new hooks exist in any mode but edit, so
+        # constraints go in after returning to previous mode. Only edit
+        # mode needs a detour to add them.
+        ensure_mode(armature, 'POSE' if prev_mode == 'EDIT' else prev_mode)
+        pose_bones = armature.pose.bones
+        for bone_name in bone_names:
+            self.setup_copy_constraint(armature, pose_bones[bone_name])
+        ensure_mode(armature, prev_mode)
 
         return {'FINISHED'}
 
     @classmethod
     def poll(cls, context):
-        return context.active_object is not None and \
-               context.active_object.type in ['ARMATURE', 'LATTICE']
+        obj = context.active_object
+        return obj is not None and obj.type in ['ARMATURE', 'LATTICE']
 
     def draw(self, context):
         layout = self.layout
@@ -952,7 +998,7 @@ class ADH_CreateSpokes(Operator):
         description="Armature layers where spoke bones will be placed",
         subtype='LAYER',
         size=32,
-        default=[x == 29 for x in range(0, 32)]
+        default=ARM_LAYERS_29
     )
 
     aux_layers = BoolVectorProperty(
@@ -961,7 +1007,7 @@ class ADH_CreateSpokes(Operator):
                     " will be placed",
         subtype='LAYER',
         size=32,
-        default=[x == 30 for x in range(0, 32)]
+        default=ARM_LAYERS_30
     )
 
     basename = StringProperty(
@@ -1015,6 +1061,15 @@ class ADH_CreateSpokes(Operator):
         dt_constraint.target = armature
         dt_constraint.subtarget = tip_name
 
+    def setup_constraints(self, armature, bone_names, prev_mode):
+        # Leaves edit mode, returning to PREV_MODE. Only tips need
+        # constraints, added once pose bones exist: in any mode but edit.
+        if self.tip:
+            ensure_mode(armature, 'POSE' if prev_mode == 'EDIT' else prev_mode)
+            for bone_name in bone_names:
+                self.setup_bone_constraint(armature, bone_name)
+        ensure_mode(armature, prev_mode)
+
     def setup_bone(self, armature, bone_name, head_co, tail_co, parent):
         bone = armature.data.edit_bones.new(bone_name)
         bone.head = head_co
@@ -1028,20 +1083,19 @@ class ADH_CreateSpokes(Operator):
         self.setup_bone_tip(armature, bone)
 
     def set_armature_layers(self, armature):
-        combined_layers = list(
-            map(any,
-                zip(armature.data.layers, self.spoke_layers, self.aux_layers)
-                if (self.parent or self.tip) else
-                zip(armature.data.layers, self.spoke_layers)))
-        armature.data.layers = combined_layers
+        layer_sets = [armature.data.layers, self.spoke_layers]
+        if self.parent or self.tip:
+            layer_sets.append(self.aux_layers)
+        armature.data.layers = merge_layers(*layer_sets)
 
     def get_vertex_coordinates(self, mesh, armature):
         # Get vertex coordinates localized to armature's matrix
         mesh.update_from_editmode()
-        armature_mat_inv = armature.matrix_world.inverted()
-        mesh_mat = mesh.matrix_world
-        return [armature_mat_inv * (mesh_mat * vert.co)
-                for vert in mesh.data.vertices if vert.select]
+        mesh_to_armature_mat = armature.matrix_world.inverted() * \
+                               mesh.matrix_world
+        vertices = mesh.data.vertices
+        return [mesh_to_armature_mat * vertices[index].co
+                for index in selected_vertex_indices(mesh.data)]
 
     def create_spokes(self, context, mesh, armature):
         scene = context.scene
@@ -1053,7 +1107,7 @@ class ADH_CreateSpokes(Operator):
         scene.objects.active = armature
         prev_mode = armature.mode
 
-        bpy.ops.object.mode_set(mode='EDIT')
+        ensure_mode(armature, 'EDIT')
         for bone in context.selected_editable_bones:
             bone.select = False
 
@@ -1062,16 +1116,12 @@ class ADH_CreateSpokes(Operator):
             parent = armature.data.edit_bones.new(PRF_ROOT + self.basename)
             parent.head = cursor_co + Vector([0, 0, -1])
             parent.tail = cursor_co
-        for index, vert_co in enumerate(vert_coordinates):
-            bone_name = "%s.%d" % (self.basename, index)
+        bone_names = ["%s.%d" % (self.basename, index)
+                      for index in range(len(vert_coordinates))]
+        for bone_name, vert_co in zip(bone_names, vert_coordinates):
             self.setup_bone(armature, bone_name, cursor_co, vert_co, parent)
 
-        bpy.ops.object.mode_set(mode='POSE')
-        for index in range(len(vert_coordinates)):
-            bone_name = "%s.%d" % (self.basename, index)
-            self.setup_bone_constraint(armature, bone_name)
-        bpy.ops.object.mode_set(mode=prev_mode)
-
+        self.setup_constraints(armature, bone_names, prev_mode)
         self.set_armature_layers(armature)
 
         return {'FINISHED'}
@@ -1079,16 +1129,14 @@ class ADH_CreateSpokes(Operator):
     def create_spoke_tips(self, context, armature):
         prev_mode = armature.mode
 
-        bpy.ops.object.mode_set(mode='EDIT')
-        for bone in context.selected_bones:
+        ensure_mode(armature, 'EDIT')
+        selected_bones = context.selected_bones
+        bone_names = [bone.name for bone in selected_bones]
+        for bone in selected_bones:
             self.setup_bone_parent(armature, bone, None)
             self.setup_bone_tip(armature, bone)
 
-        bpy.ops.object.mode_set(mode='POSE')
-        for bone in context.selected_pose_bones:
-            self.setup_bone_constraint(armature, bone.name)
-        bpy.ops.object.mode_set(mode=prev_mode)
-
+        self.setup_constraints(armature, bone_names, prev_mode)
         self.set_armature_layers(armature)
 
         return {'FINISHED'}
@@ -1160,7 +1208,7 @@ class ADH_CreateBoneGroup(Operator):
         bone_name = context.active_pose_bone.name
 
         bone_groups = [bg for bg in pose.bone_groups if bg.name == bone_name]
-        if bone_groups != []:
+        if bone_groups:
             pose.bone_groups.active = bone_groups[0]
         else:
             bpy.ops.pose.group_assign()
@@ -1180,18 +1228,22 @@ class ADH_RemoveVertexGroupsUnselectedBones(Operator):
 
     @classmethod
     def poll(self, context):
-        return context.active_object != None \
-               and context.selected_pose_bones != None
+        return context.active_object is not None \
+               and context.selected_pose_bones is not None
 
     def execute(self, context):
-        bone_names = [b.name for b in context.selected_pose_bones]
+        bone_names = frozenset(b.name for b in context.selected_pose_bones)
         affected_objects = [o for o in context.selected_objects
                             if o.type == 'MESH']
 
         for obj in affected_objects:
-            for vg in obj.vertex_groups:
-                if not (vg.name in bone_names or vg.lock_weight):
-                    obj.vertex_groups.remove(vg)
+            vertex_groups = obj.vertex_groups
+            # Collected first; removing while iterating skips groups. Last
+            # to first, so each removal shifts as few indices as possible.
+            unused_groups = [vg for vg in reversed(vertex_groups[:])
+                             if not (vg.name in bone_names or vg.lock_weight)]
+            for vg in unused_groups:
+                vertex_groups.remove(vg)
 
         return {'FINISHED'}
 
@@ -1224,20 +1276,27 @@ class ADH_BindToBone(Operator):
         armature = context.active_object
         bone = context.active_pose_bone
         for mesh in meshes:
-            armature_mods = [m for m in mesh.modifiers
-                             if m.type == 'ARMATURE' and m.object == armature]
-            if not armature_mods:
+            if not any(m.type == 'ARMATURE' and m.object == armature
+                       for m in mesh.modifiers):
                 am = mesh.modifiers.new('Armature', 'ARMATURE')
                 am.object = armature
 
             if self.set_as_parent:
                 mesh.parent = armature
 
-            vertex_indices = [v.index for v in mesh.data.vertices if v.select] \
-                if self.only_selected else range(len(mesh.data.vertices))
+            vertices = mesh.data.vertices
+            if self.only_selected:
+                vertex_indices = selected_vertex_indices(mesh.data)
+                # Only groups the selected vertices belong to need clearing.
+                group_indices = {g.group for i in vertex_indices
+                                 for g in vertices[i].groups}
+            else:
+                vertex_indices = list(range(len(vertices)))
+                group_indices = None
             vg = mesh.vertex_groups.get(bone.name, None)
             for other_vg in mesh.vertex_groups:
-                if other_vg == vg:
+                if other_vg == vg or (group_indices is not None and
+                                      other_vg.index not in group_indices):
                     continue
                 other_vg.remove(vertex_indices)
             if not vg:
@@ -1263,8 +1322,9 @@ class ADH_SyncObjectDataNameToObject(Operator):
 
     def execute(self, context):
         for obj in context.selected_objects:
-            if obj and obj.data:
-                obj.data.name = obj.name
+            data = obj.data
+            if data is not None and data.name != obj.name:
+                data.name = obj.name
 
         return {'FINISHED'}
 
@@ -1277,16 +1337,17 @@ class ADH_SyncCustomShapePositionToBone(Operator):
 
     @classmethod
     def poll(cls, context):
-        return context.active_object is not None \
-               and context.active_object.type == 'ARMATURE' \
+        obj = context.active_object
+        return obj is not None and obj.type == 'ARMATURE' \
                and context.mode == 'POSE'
 
     def execute(self, context):
+        armature = context.active_object
+        obj_to_bone = rigify.utils.obj_to_bone
         for bone in context.selected_pose_bones:
             obj = bone.custom_shape
             if obj:
-                rigify.utils.obj_to_bone(obj, context.active_object,
-                                         bone.name)
+                obj_to_bone(obj, armature, bone.name)
 
         return {'FINISHED'}
 
@@ -1302,7 +1363,8 @@ class ADH_RapidPasteDriver(Operator):
 
     @classmethod
     def poll(self, context):
-        return context.space_data.type == 'PROPERTIES'
+        space = context.space_data
+        return space is not None and space.type == 'PROPERTIES'
 
     def cancel(self, context):
         context.window_manager.event_timer_remove(self._timer)
@@ -1351,8 +1413,8 @@ class ADH_MapShapeKeysToBones(Operator):
 
     @classmethod
     def poll(self, context):
-        return context.active_object != None \
-               and context.active_object.type in ['MESH', 'LATTICE'] \
+        obj = context.active_object
+        return obj is not None and obj.type in ['MESH', 'LATTICE'] \
                and len(context.selected_objects) == 2
 
     def execute(self, context):
@@ -1372,11 +1434,12 @@ class ADH_MapShapeKeysToBones(Operator):
 
         slider_formula = "a * %0.1f" % (1.0 / self.slider_distance) \
             if self.slider_distance != 0.0 else "a"
+        selected_bone_names = {b.name for b in armature.data.bones if b.select}
+        reference_key = mesh_keys.reference_key
         for shape in mesh_keys.key_blocks:
             # Create driver only if the shape key isn't Basis, the
             # corresponding bone exists and is selected.
-            bone = armature.data.bones.get(shape.name, None)
-            if shape == mesh_keys.reference_key or not (bone and bone.select):
+            if shape == reference_key or shape.name not in selected_bone_names:
                 continue
 
             data_path = 'key_blocks["%s"].value' % shape.name
@@ -1384,18 +1447,28 @@ class ADH_MapShapeKeysToBones(Operator):
 
             dv = fc.driver.variables[0] if len(fc.driver.variables) > 0 \
                 else fc.driver.variables.new()
-            dv.name = "a"
-            dv.type = "TRANSFORMS"
+            # Existing drivers are usually already set up; only write what
+            # differs, every RNA write triggers an update.
+            if dv.name != "a":
+                dv.name = "a"
+            if dv.type != "TRANSFORMS":
+                dv.type = "TRANSFORMS"
 
             target = dv.targets[0]
-            target.id = armature
-            target.bone_target = shape.name
-            target.data_path = dv.targets[0].data_path
-            target.transform_space = "LOCAL_SPACE"
-            target.transform_type = self.slider_axis
-
-            fc.driver.type = "SCRIPTED"
-            fc.driver.expression = slider_formula
+            if target.id != armature:
+                target.id = armature
+            if target.bone_target != shape.name:
+                target.bone_target = shape.name
+            if target.transform_space != "LOCAL_SPACE":
+                target.transform_space = "LOCAL_SPACE"
+            if target.transform_type != self.slider_axis:
+                target.transform_type = self.slider_axis
+
+            driver = fc.driver
+            if driver.type != "SCRIPTED":
+                driver.type = "SCRIPTED"
+            if driver.expression != slider_formula:
+                driver.expression = slider_formula
 
         return {"FINISHED"}
 
@@ -1406,47 +1479,43 @@ class ADH_CopyDriverSettings(Operator):
     bl_label = 'Copy Driver Settings'
     bl_options = {'REGISTER', 'UNDO'}
 
-    increment_dict = {}
-
     @classmethod
     def poll(self, context):
-        return context.space_data.type == 'GRAPH_EDITOR' \
-               and context.space_data.mode == 'DRIVERS' \
-               and context.active_object != None \
-               and context.space_data.dopesheet.show_only_selected
+        space = context.space_data
+        return space is not None \
+               and space.type == 'GRAPH_EDITOR' \
+               and space.mode == 'DRIVERS' \
+               and context.active_object is not None \
+               and space.dopesheet.show_only_selected
 
     def invoke(self, context, event):
         obj = context.active_object
         props = context.scene.adh_rigging_tools
 
+        self.increment_dict = {}
         self.generate_increment_dict(props.driver_increment_index)
-        shape_keys = getattr(obj.data, 'shape_keys', None)
-        keyable_list = [shape_keys] if shape_keys else []
-        for ms in obj.material_slots:
-            if not ms:
+        keyable_list = [getattr(obj.data, 'shape_keys', None)]
+        for material in [ms.material for ms in obj.material_slots if ms]:
+            if material is None:
                 continue
-            keyable_list.append(ms.material)
-            for ts in ms.material.texture_slots:
-                if not ts:
-                    continue
-                keyable_list.append(ts.texture)
-        for ps in obj.particle_systems:
-            keyable_list.append(ps.settings)
-        keyable_list.append(obj)
-        keyable_list.append(obj.data)
-
+            keyable_list.append(material)
+            keyable_list.extend(ts.texture for ts in material.texture_slots if ts)
+        keyable_list.extend(ps.settings for ps in obj.particle_systems)
+        keyable_list.extend([obj, obj.data])
+
+        # Only datablocks that can hold drivers are worth walking.
+        keyable_list = [k for k in keyable_list
+                        if k is not None and k.animation_data is not None]
         self.process_keyable_list(context, keyable_list)
 
         return {'FINISHED'}
 
     def generate_increment_dict(self, increment_list_str):
-        increment_dict_re = re.compile(r"(\d+)\D*([+-])\D*(\d+)\D*")
-
         start_pos = 0
         key = 0
         increment = 0
         while True:
-            match_obj = increment_dict_re.search(increment_list_str, start_pos)
+            match_obj = INCREMENT_DICT_RE.search(increment_list_str, start_pos)
             if not match_obj:
                 break
 
@@ -1464,8 +1533,6 @@ class ADH_CopyDriverSettings(Operator):
         driver = None
         index = 1
         for keyable in keyable_list:
-            if not keyable or not keyable.animation_data:
-                continue
             for fc in keyable.animation_data.drivers:
                 if not fc.select:
                     continue
@@ -1496,26 +1563,62 @@ class ADH_CopyDriverSettings(Operator):
             target.transform_type = dv.targets[0].transform_type
 
     def substitute_incremented(self, expression, multiplier):
-        int_re = re.compile(r"\d+")
+        match_indices = itertools.count(1)
 
-        start_pos = 0
-        match_index = 1
-        newExpression = ''
-        while True:
-            match_obj = int_re.search(expression, start_pos)
-            if not match_obj:
-                newExpression += expression[start_pos:]
-                break
-
-            newExpression += expression[start_pos:match_obj.start()]
+        def increment_match(match_obj):
             value = int(match_obj.group()) + \
-                    (self.increment_dict.get(match_index, 0) * multiplier)
-            newExpression += str(value)
-
-            match_index += 1
-            start_pos = match_obj.end()
-
-        return newExpression
+                    (self.increment_dict.get(next(match_indices), 0) * multiplier)
+            return str(value)
+
+        return INT_RE.sub(increment_match, expression)
+
+
+# Menu and panel operator blocks: one tuple of (operator idname, text)
+# pairs per column. A text of None keeps the operator's own label, a None
+# entry draws a separator.
+OBJECT_SPECIALS_COLUMNS = (
+    (('lattice.adh_bind_to_objects', None),
+     ('object.adh_map_shape_keys_to_bones', None)),
+    (('object.adh_sync_data_name_to_object', 'ObData.name <- Ob.name'),),
+)
+ARMATURE_SPECIALS_COLUMNS = (
+    (('armature.adh_use_same_shape', None),
+     ('armature.adh_create_shape', None),
+     ('armature.adh_select_shape', None),
+     None,
+     ('object.adh_sync_shape_position_to_bone', 'CustShape.pos <- Bone.pos')),
+    (('armature.adh_create_hooks', None),
+     ('armature.adh_create_spokes', None),
+     ('armature.adh_create_bone_group', None),
+     ('armature.adh_remove_vertex_groups_unselected_bones',
+      'Remove Unselected VG'),
+     ('armature.adh_bind_to_bone', None)),
+)
+PANEL_SHAPE_COLUMNS = (
+    (('armature.adh_copy_shapes', None),
+     ('armature.adh_use_same_shape', None),
+     ('armature.adh_create_shape', None),
+     ('armature.adh_select_shape', None)),
+)
+PANEL_SYNC_COLUMNS = (
+    (('object.adh_sync_data_name_to_object', 'ObData.name <- Ob.name'),
+     ('object.adh_sync_shape_position_to_bone', 'CustShape.pos <- Bone.pos')),
+)
+
+
+def draw_operator_columns(layout, columns, align=False):
+    row = layout.row()
+    for operators in columns:
+        col = row.column(align=align)
+        for entry in operators:
+            if entry is None:
+                col.separator()
+                continue
+            idname, text = entry
+            if text is None:
+                col.operator(idname)
+            else:
+                col.operator(idname, text=text)
 
 
 def draw_armature_specials(self, context):
@@ -1570,12 +1673,7 @@ class VIEW3D_PT_adh_rigging_tools(Panel):
         row1.operator('mesh.adh_mask_selected_vertices')
         row1.operator('mesh.adh_delete_mask', text='', icon='CANCEL')
 
-        row = layout.row()
-        col = row.column(align=1)
-        col.operator('armature.adh_copy_shapes')
-        col.operator('armature.adh_use_same_shape')
-        col.operator('armature.adh_create_shape')
-        col.operator('armature.adh_select_shape')
+        draw_operator_columns(layout, PANEL_SHAPE_COLUMNS, align=True)
 
         row = layout.row()
         col = row.column(align=1)
@@ -1587,49 +1685,21 @@ class VIEW3D_PT_adh_rigging_tools(Panel):
                      text='Remove Unselected VG')
         col.operator('armature.adh_bind_to_bone')
 
-        row = layout.row()
-        col = row.column(align=1)
-        col.operator('object.adh_sync_data_name_to_object', text='ObData.name <- Ob.name')
-        col.operator('object.adh_sync_shape_position_to_bone', text='CustShape.pos <- Bone.pos')
+        draw_operator_columns(layout, PANEL_SYNC_COLUMNS, align=True)
 
 
 class VIEW3D_MT_adh_object_specials(Menu):
     bl_label = "ADH Rigging Tools"
 
     def draw(self, context):
-        layout = self.layout
-        row = layout.row()
-
-        col = row.column()
-        col.operator('lattice.adh_bind_to_objects')
-        col.operator('object.adh_map_shape_keys_to_bones')
-
-        col = row.column()
-        col.operator('object.adh_sync_data_name_to_object', text='ObData.name <- Ob.name')
+        draw_operator_columns(self.layout, OBJECT_SPECIALS_COLUMNS)
 
 
 class VIEW3D_MT_adh_armature_specials(Menu):
     bl_label = "ADH Rigging Tools"
 
     def draw(self, context):
-        layout = self.layout
-        row = layout.row()
-
-        col = row.column()
-        col.operator('armature.adh_use_same_shape')
-        col.operator('armature.adh_create_shape')
-        col.operator('armature.adh_select_shape')
-
-        col.separator()
-        col.operator('object.adh_sync_shape_position_to_bone', text='CustShape.pos <- Bone.pos')
-
-        col = row.column()
-        col.operator('armature.adh_create_hooks')
-        col.operator('armature.adh_create_spokes')
-        col.operator('armature.adh_create_bone_group')
-        col.operator('armature.adh_remove_vertex_groups_unselected_bones',
-                     text='Remove Unselected VG')
-        col.operator('armature.adh_bind_to_bone')
+        draw_operator_columns(self.layout, ARMATURE_SPECIALS_COLUMNS)
 
 
 class ADH_RiggingToolsPreferences(bpy.types.AddonPreferences):
@@ -1669,28 +1739,70 @@ def turn_off_glsl_handler(dummy):
     # bpy.data.window_managers no longer crashes.
     window = bpy.context.window
     if window is not None:
-        view_areas = [area for area in window.screen.areas
-                      if area.type == 'VIEW_3D']
-        for area in view_areas:
+        for area in window.screen.areas:
+            if area.type != 'VIEW_3D':
+                continue
             area.spaces.active.viewport_shade = 'SOLID'
 
     scene = bpy.context.scene
-    if scene and scene.game_settings.material_mode == 'GLSL':
+    if scene is None:
+        return
+    if scene.game_settings.material_mode == 'GLSL':
         scene.game_settings.material_mode = 'MULTITEXTURE'
 
     prefs = bpy.context.user_preferences.addons[__name__].preferences
-    for obj in scene.objects:
+    hide_multires = prefs.hide_multires_modifier
+    hide_particles = prefs.hide_particles_modifier
+    if not (hide_multires or hide_particles):
+        return
+
+    # Only meshes can carry multires or particle system modifiers.
+    for obj in (o for o in scene.objects if o.type == 'MESH'):
         for mod in obj.modifiers:
-            if mod.type == "MULTIRES" and prefs.hide_multires_modifier:
-                mod.levels = 0
-                mod.sculpt_levels = 0
-                mod.show_viewport = False
-            elif mod.type.startswith("PARTICLE_") and prefs.hide_particles_modifier:
-                mod.show_viewport = False
+            mod_type = mod.type
+            if hide_multires and mod_type == "MULTIRES":
+                if mod.levels or mod.sculpt_levels or mod.show_viewport:
+                    mod.levels = 0
+                    mod.sculpt_levels = 0
+                    mod.show_viewport = False
+            elif hide_particles and mod_type.startswith("PARTICLE_"):
+                if mod.show_viewport:
+                    mod.show_viewport = False
+
+
+CLASSES = (
+    ADH_RiggingToolsPreferences,
+    ADH_RiggingToolsProps,
+    ADH_RenameRegex,
+    ADH_AddSubdivisionSurfaceModifier,
+    ADH_BindToLattice,
+    ADH_ApplyLattices,
+    ADH_DeleteMask,
+    ADH_MaskSelectedVertices,
+    ADH_CopyCustomShapes,
+    ADH_UseSameCustomShape,
+    ADH_CreateCustomShape,
+    ADH_SelectCustomShape,
+    ADH_CreateHooks,
+    ADH_CreateSpokes,
+    ADH_CreateBoneGroup,
+    ADH_RemoveVertexGroupsUnselectedBones,
+    ADH_BindToBone,
+    ADH_SyncObjectDataNameToObject,
+    ADH_SyncCustomShapePositionToBone,
+    ADH_RapidPasteDriver,
+    ADH_MapShapeKeysToBones,
+    ADH_CopyDriverSettings,
+    GRAPH_PT_adh_rigging_tools,
+    VIEW3D_PT_adh_rigging_tools,
+    VIEW3D_MT_adh_object_specials,
+    VIEW3D_MT_adh_armature_specials,
+)
 
 
 def register():
-    bpy.utils.register_module(__name__)
+    for cls in CLASSES:
+        bpy.utils.register_class(cls)
 
     bpy.types.Scene.adh_rigging_tools = PointerProperty \
         (type=ADH_RiggingToolsProps)
@@ -1701,7 +1813,8 @@ def register():
 
 
 def unregister():
-    bpy.utils.unregister_module(__name__)
+    for cls in reversed(CLASSES):
+        bpy.utils.unregister_class(cls)
 
     del bpy.types.Scene.adh_rigging_tools
     bpy.app.handlers.load_post.remove(turn_off_glsl_handler)